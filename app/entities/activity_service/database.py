@@ -2,10 +2,8 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
-from dotenv import load_dotenv
-
-# load biến môi trường từ file .env
-load_dotenv()
+# .env được load một lần trong config.config
+import config.config  # noqa: F401
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
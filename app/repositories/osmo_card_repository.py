@@ -14,7 +14,6 @@ from aiocache.serializers import JsonSerializer
         key_builder=lambda f:  f"osmo_cards_list",
         serializer=JsonSerializer(),
 )
-@cached(ttl=60 * 10 * 3, cache=RedisCache, key_builder=lambda f:  f"osmo_cards_list")
 async def get_all_osmo_cards() -> List[OsmoCard]:
     async with AsyncSessionLocal() as session:
         result = await session.execute(select(OsmoCard).where(OsmoCard.status == 1))
@@ -3,6 +3,7 @@ import os
 from typing import Optional
 from app.services.audio.audio_service import (
     convert_audio_to_wav_and_upload,
+    validate_audio_file,
     text_to_wav_local,
     text_to_wav_and_upload,
 )
@@ -20,7 +21,7 @@ async def convert_to_wav_api(
     end_time: Optional[float] = Query(None, description="End time in seconds (optional)", ge=0)
 ):
     # Chỉ cho phép mp3 và mp4
-    if not (file.filename.lower().endswith(".mp3") or file.filename.lower().endswith(".mp4")):
+    if not validate_audio_file(file.filename):
         raise HTTPException(status_code=400, detail="Only .mp3 or .mp4 files are supported.")
     
     # Validate time parameters
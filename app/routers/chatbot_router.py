@@ -2,8 +2,9 @@
 Chatbot Router - RAG-based Q&A API
 """
 import logging
+from aiocache import cached
 from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 from app.models.chatbot_models import ChatbotQuery, ChatbotResponse, RetrievedDocumentResponse
 from app.services.rag.retrieval_service import get_retrieval_service
@@ -113,7 +114,7 @@ async def chatbot_health():
         doc_count = vector_store.get_document_count()
         embedding_dim = embedding_service.get_dimension()
         
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "status": "healthy",
                 "components": {
@@ -137,7 +138,7 @@ async def chatbot_health():
         )
     except Exception as e:
         logger.error(f"Health check failed: {e}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             content={
                 "status": "unhealthy",
@@ -162,7 +163,7 @@ async def get_knowledge_base_stats():
         
         # Test connection first
         if not vector_store.test_connection():
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 content={
                     "error": "Cannot connect to ChromaDB server",
@@ -192,7 +193,7 @@ async def get_knowledge_base_stats():
         except Exception as e:
             logger.warning(f"Could not analyze categories: {str(e)}")
         
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "status": "connected",
                 "mode": rag_config.CHROMA_MODE,
@@ -205,7 +206,7 @@ async def get_knowledge_base_stats():
         
     except Exception as e:
         logger.error(f"Error getting stats: {str(e)}", exc_info=True)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={
                 "error": "Error getting stats",
@@ -255,7 +256,7 @@ async def query_chatbot(query: ChatbotQuery):
         )
         
         # Only return answer for frontend
-        return JSONResponse(content={"answer": result["answer"]})
+        return ORJSONResponse(content={"answer": result["answer"]})
         
     except Exception as e:
         logger.error(f"Error in frontend query: {e}")
@@ -265,10 +266,40 @@ async def query_chatbot(query: ChatbotQuery):
         )
 
 
+@cached(ttl=60 * 5, key_builder=lambda f: "kb_categories")
+async def _load_categories() -> dict:
+    """Category counts of the knowledge base, cached in memory for 5 minutes (not invalidated on ingest)."""
+    from app.services.rag.vector_store_service import get_vector_store_service
+
+    vector_store = get_vector_store_service()
+    doc_count = vector_store.get_document_count()
+
+    categories_dict = {}
+    if doc_count > 0:
+        all_docs = vector_store.get_all_documents()
+
+        if all_docs.get('metadatas'):
+            for metadata in all_docs['metadatas']:
+                category = metadata.get('category', 'unknown')
+                categories_dict[category] = categories_dict.get(category, 0) + 1
+
+    categories_list = [
+        {"name": cat, "count": count}
+        for cat, count in sorted(categories_dict.items())
+    ]
+    return {
+        "categories": categories_list,
+        "total": doc_count
+    }
+
+
 @router.get("/categories")
 async def get_categories():
     """
     Get all available categories in the knowledge base
+
+    Counts are cached in memory per worker for up to 5 minutes, so they can
+    lag behind a knowledge base update by that long.
     
     Returns:
         List of categories with document counts
@@ -284,31 +315,7 @@ async def get_categories():
         }
     """
     try:
-        from app.services.rag.vector_store_service import get_vector_store_service
-        
-        vector_store = get_vector_store_service()
-        doc_count = vector_store.get_document_count()
-        
-        categories_dict = {}
-        if doc_count > 0:
-            all_docs = vector_store.get_all_documents()
-            
-            if all_docs.get('metadatas'):
-                for metadata in all_docs['metadatas']:
-                    category = metadata.get('category', 'unknown')
-                    categories_dict[category] = categories_dict.get(category, 0) + 1
-        
-        categories_list = [
-            {"name": cat, "count": count}
-            for cat, count in sorted(categories_dict.items())
-        ]
-        
-        return JSONResponse(
-            content={
-                "categories": categories_list,
-                "total": doc_count
-            }
-        )
+        return ORJSONResponse(content=await _load_categories())
         
     except Exception as e:
         logger.error(f"Error getting categories: {e}")
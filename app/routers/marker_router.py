@@ -2,7 +2,8 @@
 from typing import Optional
 
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-import shutil, os, base64, cv2
+from starlette.concurrency import run_in_threadpool
+import shutil, os, base64, cv2, tempfile
 
 from app.services.marker.marker_service import MarkerService
 from app.models.marker import MarkerResponse
@@ -10,13 +11,19 @@ from app.models.marker import MarkerResponse
 router = APIRouter()
 service = MarkerService()
 
+
+async def _save_upload(file: UploadFile) -> str:
+    """Stream upload ra file tạm (chunk 1 MiB, ngoài event loop), trả về đường dẫn."""
+    suffix = os.path.splitext(file.filename or "")[1]
+    with tempfile.NamedTemporaryFile(delete=False, prefix="temp_", suffix=suffix) as buffer:
+        await run_in_threadpool(shutil.copyfileobj, file.file, buffer, 1024 * 1024)
+        return buffer.name
+
 @router.post("/detect", response_model=MarkerResponse)
 async def detect_marker(file: UploadFile = File(...)):
     try:
         # Lưu file tạm
-        temp_path = f"temp_{file.filename}"
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        temp_path = await _save_upload(file)
 
         result = service.detect_marker(temp_path)
 
@@ -36,9 +43,7 @@ async def embed_marker(
     pos_y: Optional[str] = Form(None)
 ):
     try:
-        temp_path = f"temp_{file.filename}"
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        temp_path = await _save_upload(file)
 
         pos = None
         if pos_x and pos_y:  # chỉ khi cả hai khác rỗng
@@ -70,9 +75,7 @@ async def embed_marker(
 ):
     try:
         # lưu file tạm
-        temp_path = f"temp_{file.filename}"
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        temp_path = await _save_upload(file)
 
         out_path = service.embed_marker(temp_path, page_id, size=size)
 
@@ -3,7 +3,7 @@ from typing import Optional
 from fastapi import APIRouter, UploadFile, File, HTTPException, Body, BackgroundTasks
 from pydantic import BaseModel
 
-from app.services.audio.audio_service import convert_audio_to_wav_and_upload
+from app.services.audio.audio_service import convert_audio_to_wav_and_upload, validate_audio_file
 from app.services.music.planner import build_activity_json
 from app.services.music.progress_tracker import progress_tracker
 
@@ -123,7 +123,7 @@ async def upload_music_and_generate_plan(
         async_mode: If True, returns task_id for progress tracking. If False, blocks until complete.
     """
     # Chỉ cho phép mp3 và mp4
-    if not (file.filename.lower().endswith(".mp3") or file.filename.lower().endswith(".mp4")):
+    if not validate_audio_file(file.filename):
         raise HTTPException(status_code=400, detail="Only .mp3 or .mp4 files are supported.")
 
     # Validate time parameters
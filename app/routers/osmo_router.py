@@ -23,12 +23,9 @@ async def parse_action_cards(action_card_list: ActionCardList):
 
 @router.post("/recognize_action_cards_from_image")
 async def recognize_action_cards_from_image_api(image: UploadFile = File(...)):
-    import tempfile, shutil, os
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(image.filename)[-1]) as temp:
-        shutil.copyfileobj(image.file, temp)
-        temp_path = temp.name
     try:
-        action_card_list = await recognize_action_cards_from_image(temp_path)
+        # Recognizer takes the bytes directly; no temp file round-trip
+        action_card_list = await recognize_action_cards_from_image(await image.read())
         actions = await parse_action_card_list(action_card_list)
 
         print(actions)
@@ -41,5 +38,3 @@ async def recognize_action_cards_from_image_api(image: UploadFile = File(...)):
 
     except Exception as e:
         return {"error": str(e)}
-    finally:
-        os.remove(temp_path)
@@ -4,7 +4,7 @@ API endpoint để lấy thông tin robot qua WebSocket
 """
 
 from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from typing import Optional
 import logging
 
@@ -56,7 +56,7 @@ async def get_robot_info(
         # ✅ Robot offline → HTTP 200, status=error
         if not result.get("success"):
             logger.warning(f"Failed to get robot info for {serial}: {result.get('message')}")
-            return JSONResponse(
+            return ORJSONResponse(
                 content={
                     "status": "error",
                     "message": f"Robot {serial} not connected via WebSocket",
@@ -87,7 +87,7 @@ async def get_robot_info(
         logger.info(
             f"Returning robot info for {serial}: battery={battery_level}%, charging={is_charging}, serial={data.get('serial_number')}")
         
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "status": "success",
                 "message": "Robot info retrieved successfully",
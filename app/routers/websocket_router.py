@@ -1,15 +1,29 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from starlette.responses import Response
 from pydantic import BaseModel
 from typing import Set, Optional
-import json
+import asyncio
 import logging
 
+import orjson
+
 from app.services.socket.robot_websocket_service import robot_websocket_info_service
-from app.services.socket.connection_manager import connection_manager
+from app.services.socket.connection_manager import connection_manager, signaling_manager, WSMapEntry
+from app.services.socket.handlers.binary_handler import handle_binary_message
+from app.services.socket.handlers.text_handler import handle_text_message
 
 router = APIRouter()
+# Mounted without prefix: robots and web clients connect to /ws/...
+alias_router = APIRouter()
 logging.basicConfig(level=logging.INFO)
+ws_logger = logging.getLogger("ws")
+
+# Fixed denial response for robots connecting without x-robot-model-id
+_DENY_NO_MODEL = Response('No robot model id', 401)
+
+# Max binary frames buffered per robot while a previous command is still being handled
+ROBOT_FRAME_QUEUE_SIZE = 64
 
 # Pydantic model cho command
 class Command(BaseModel):
@@ -23,36 +37,42 @@ async def send_command(serial: str, command: Command):
     """
     Gửi command tới robot qua WebSocket ConnectionManager
     """
+    # Dump once; the same dict is sent to the robot and echoed in the response
+    payload = command.model_dump()
     ok = await connection_manager.send_to_client(
         serial,
-        command.model_dump_json(),
+        orjson.dumps(payload).decode(),
         client_type="robot"  # mặc định gửi tới robot
     )
-    return JSONResponse({
+    return ORJSONResponse({
         "status": "sent" if ok else "failed",
         "to": serial,
-        "command": command.model_dump(),
+        "command": payload,
         "active_clients": connection_manager.active
     })
 
+def _serials_for_client(client_id: str) -> Set[str]:
+    # clients is {serial: {client_type: WSMapEntry}}
+    return {
+        serial
+        for serial, entries in connection_manager.clients.items()
+        if any(entry.client_id == client_id for entry in entries.values())
+    }
+
 # --- List serials by client_id ---
 @router.get("/ws/list-by-client/{client_id}")
 async def list_by_client(client_id: str):
-    result: Set[str] = set()
-    for serial, info in connection_manager.clients.items():
-        if info.client_id == client_id:
-            result.add(serial)
-    return {"serials": result}
+    return {"serials": _serials_for_client(client_id)}
 
 # --- Disconnect all robots by client_id ---
 @router.get("/ws/disconnect-by-client/{client_id}")
 async def disconnect_by_client(client_id: str):
-    result: Set[str] = set()
-    for serial, info in connection_manager.clients.items():
-        if info.client_id == client_id:
-            result.add(serial)
-    for serial in result:
-        await connection_manager.disconnect(serial)
+    result = _serials_for_client(client_id)
+    # Close all sockets concurrently; one slow close handshake shouldn't delay the rest
+    await asyncio.gather(
+        *(connection_manager.disconnect(serial) for serial in result),
+        return_exceptions=True,
+    )
     return {"serials": result}
 
 # --- Disconnect single robot ---
@@ -64,3 +84,141 @@ async def close_connection(serial: str):
         return {"status": "ok"}
     except Exception as e:
         raise HTTPException(500, str(e))
+
+
+async def _consume_binary_frames(websocket: WebSocket, queue: asyncio.Queue, serial: str, model_id: str):
+    """Drain queued robot binary frames one at a time; a failing frame is logged and skipped."""
+    while True:
+        data = await queue.get()
+        try:
+            await handle_binary_message(websocket, data, serial, model_id)
+        except Exception:
+            ws_logger.exception("Binary frame handling failed for %s", serial)
+
+
+async def _enqueue_binary_frame(queue: asyncio.Queue, data: bytes, consumer: asyncio.Task):
+    """Queue a frame, waiting for room (backpressure) unless the consumer task has stopped.
+
+    The consumer swallows per-frame errors, so it only ends if it is cancelled or hit
+    by a BaseException; in that case raise rather than block forever on a full queue.
+    """
+    if not consumer.done():
+        if not queue.full():
+            queue.put_nowait(data)
+            return
+        put = asyncio.ensure_future(queue.put(data))
+        try:
+            await asyncio.wait({put, consumer}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # asyncio.wait does not cancel its futures, also when this task is cancelled
+            if not put.done():
+                put.cancel()
+        if not put.cancelled():
+            return
+    raise RuntimeError("binary frame consumer stopped")
+
+
+# Backward-compatible alias path for websocket without /websocket prefix
+@alias_router.websocket("/ws/{serial}")
+async def websocket_alias(websocket: WebSocket, serial: str):
+    model_id = websocket.headers.get('x-robot-model-id', None)
+    
+    if not model_id:
+        await websocket.send_denial_response(_DENY_NO_MODEL)
+        return
+    
+    websocket.max_message_size = 10 * 1024 * 1024
+    success = await connection_manager.connect(websocket, serial)
+    if not success:
+        return  # Connection was rejected
+    ws_logger.debug("Robot %s connected with model id %s", serial, model_id)
+    # Binary commands are processed in order by a separate task so the receive
+    # loop keeps reading. Text frames are replies to server-initiated requests
+    # (system info, status) that an HTTP caller is awaiting; they are handled
+    # immediately, ahead of queued binary commands, so those waits don't time out.
+    # Plain create_task + cancel instead of TaskGroup: the image runs Python 3.9.
+    queue: asyncio.Queue = asyncio.Queue(maxsize=ROBOT_FRAME_QUEUE_SIZE)
+    consumer = asyncio.create_task(_consume_binary_frames(websocket, queue, serial, model_id))
+    receive = websocket.receive
+    try:
+        while True:
+            # Accept both text and binary messages; binary (protobuf) is the hot path
+            message = await receive()
+            message_type = message["type"]
+            if message_type == "websocket.receive":
+                data = message.get("bytes")
+                if data is not None:
+                    await _enqueue_binary_frame(queue, data, consumer)
+                else:
+                    await handle_text_message(message["text"], serial)
+            elif message_type == "websocket.disconnect":
+                break
+    except WebSocketDisconnect:
+        ws_logger.info("WebSocket disconnected: %s", websocket.client)
+        await connection_manager.disconnect(serial)
+    except Exception as e:
+        ws_logger.warning("WebSocket error: %s, %s", websocket.client, e)
+        await connection_manager.disconnect(serial)
+    finally:
+        consumer.cancel()
+
+
+# Signaling endpoint (without /websocket prefix)
+@alias_router.websocket("/ws/signaling/{serial}/{client_type}")
+async def signaling_main(ws: WebSocket, serial: str, client_type: str):
+    ws.max_message_size = 10 * 1024 * 1024
+    """
+    WebSocket signaling giữa robot và web client - Direct route
+    client_type: "robot" hoặc "web"
+    """
+    ws_logger.info("Signaling connection attempt: %s/%s", serial, client_type)
+
+    # Accept connection immediately
+    await ws.accept()
+
+    try:
+        # Validate
+        if client_type not in ["robot", "web"]:
+            await ws.close(code=1008, reason="Invalid client_type")
+            return
+
+        # Add to connection manager
+        if serial not in signaling_manager.clients:
+            signaling_manager.clients[serial] = {}
+
+        # Close old connection of same type
+        if client_type in signaling_manager.clients[serial]:
+            try:
+                old_ws = signaling_manager.clients[serial][client_type].websocket
+                if old_ws.client_state.name != "DISCONNECTED":
+                    await old_ws.close(reason=f"New {client_type} connection")
+            except:
+                pass
+
+        signaling_manager.clients[serial][client_type] = WSMapEntry(ws, ws.headers.get("client_id"))
+        ws_logger.info("✅ Signaling connection established: %s/%s", serial, client_type)
+
+        # Relay to other side; bind per-connection invariants once
+        target_type = "web" if client_type == "robot" else "robot"
+        receive = ws.receive_text
+        is_connected = signaling_manager.is_connected
+        send = signaling_manager.send_to_client
+
+        # Message loop
+        while True:
+            # Relay raw text frame; the server never inspects the payload
+            raw = await receive()
+            ws_logger.debug("Signaling data from %s: %s", client_type, raw)
+
+            if is_connected(serial, target_type):
+                await send(serial, raw, target_type)
+
+    except WebSocketDisconnect:
+        ws_logger.info("Signaling disconnected: %s/%s", serial, client_type)
+    except Exception as e:
+        ws_logger.error("Signaling error: %s", e)
+    finally:
+        try:
+            await signaling_manager.disconnect(serial, client_type)
+        except:
+            pass
@@ -1,22 +1,25 @@
 import boto3
+from boto3.s3.transfer import TransferConfig
 from fastapi import UploadFile
 import os
 import tempfile
 from pydub import AudioSegment
 import shutil
 from botocore.exceptions import NoCredentialsError, BotoCoreError, ClientError
-from dotenv import load_dotenv
 import time
 import io
+import asyncio
 from typing import List, Optional, Dict, Any
 import subprocess
+import wave
 
 
 # Explicitly set ffmpeg path for Windows
 if os.name == "nt":
     AudioSegment.converter = shutil.which("ffmpeg") or "ffmpeg"
 
-load_dotenv()
+# .env được load một lần trong config.config
+import config.config  # noqa: F401
 
 AWS_ACCESS_KEY_ID = os.getenv("CLOUD_AWS_CREDENTIALS_ACCESS_KEY")
 AWS_SECRET_ACCESS_KEY = os.getenv("CLOUD_AWS_CREDENTIALS_SECRET_KEY")
@@ -30,6 +33,14 @@ s3_client = boto3.client(
     region_name=AWS_REGION
 )
 
+# Multipart (8 MiB parts, up to 8 parallel) for large WAV uploads; small files go in one PUT
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True
+)
+
 # Separate Polly client (can reuse same credentials)
 polly_client = boto3.client(
     "polly",
@@ -38,11 +49,21 @@ polly_client = boto3.client(
     region_name=AWS_REGION
 )
 
+# Upload extensions accepted by the convert endpoints (lower-case, checked in one endswith call)
+ALLOWED_AUDIO_EXTENSIONS = (".mp3", ".mp4")
+
+def validate_audio_file(filename: Optional[str], allowed_extensions: tuple = ALLOWED_AUDIO_EXTENSIONS) -> bool:
+    """Return True if filename has one of the allowed (lower-case) extensions."""
+    if not filename:
+        return False
+    return filename.lower().endswith(allowed_extensions)
+
+# Chunk size used when copying uploads to temp files
+UPLOAD_COPY_CHUNK_SIZE = 1024 * 1024
+
 async def convert_audio_to_wav_and_upload(file: UploadFile, start_time: Optional[float] = None, end_time: Optional[float] = None):
     if not shutil.which("ffmpeg"):
         raise RuntimeError("ffmpeg is not installed or not in PATH. Please install ffmpeg.")
-    if not shutil.which("ffprobe"):
-        raise RuntimeError("ffprobe is required to calculate duration. Please install ffmpeg (includes ffprobe).")
     
     # Validate time parameters
     if start_time is not None and start_time < 0:
@@ -55,8 +76,9 @@ async def convert_audio_to_wav_and_upload(file: UploadFile, start_time: Optional
     # Lưu file upload tạm
     suffix = os.path.splitext(file.filename)[1].lower()
     with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_in:
-        temp_in.write(await file.read())
-        temp_in.flush()
+        # Stream the spooled upload to disk in chunks, off the event loop
+        await file.seek(0)
+        await asyncio.to_thread(shutil.copyfileobj, file.file, temp_in, UPLOAD_COPY_CHUNK_SIZE)
         temp_in_path = temp_in.name
 
     # File WAV output tạm
@@ -81,6 +103,8 @@ async def convert_audio_to_wav_and_upload(file: UploadFile, start_time: Optional
         
         # Add output format settings
         ffmpeg_cmd.extend([
+            "-vn",             # bỏ qua video stream (mp4)
+            "-acodec", "pcm_s16le",
             "-ar", "16000",    # sample rate 16kHz
             "-ac", "1",        # mono
             temp_out_path
@@ -89,15 +113,9 @@ async def convert_audio_to_wav_and_upload(file: UploadFile, start_time: Optional
         # Convert to WAV with optional trimming
         subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
-        # Tính duration bằng ffprobe
-        result = subprocess.run([
-            "ffprobe", "-v", "error",
-            "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            temp_out_path
-        ], capture_output=True, text=True, check=True)
-
-        duration_seconds = round(float(result.stdout.strip()), 2)
+        # Tính duration từ header WAV (PCM) thay vì chạy thêm process ffprobe
+        with wave.open(temp_out_path, "rb") as wav_file:
+            duration_seconds = round(wav_file.getnframes() / float(wav_file.getframerate()), 2)
 
         # Tên file khi upload lên S3
         timestamp = int(time.time() * 1000)
@@ -106,11 +124,13 @@ async def convert_audio_to_wav_and_upload(file: UploadFile, start_time: Optional
 
         # Upload lên S3
         try:
-            s3_client.upload_file(
+            await asyncio.to_thread(
+                s3_client.upload_file,
                 temp_out_path,
                 S3_BUCKET_NAME,
                 s3_key,
-                ExtraArgs={"ContentType": "audio/wav"}
+                ExtraArgs={"ContentType": "audio/wav"},
+                Config=S3_TRANSFER_CONFIG
             )
             file_url = f"https://{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{s3_key}"
         except NoCredentialsError:
@@ -233,11 +253,13 @@ async def text_to_wav_and_upload(text: str, voice: Optional[str] = None, file_na
         s3_key = f"tts/{download_name}"
 
         try:
-            s3_client.upload_file(
+            await asyncio.to_thread(
+                s3_client.upload_file,
                 wav_path,
                 S3_BUCKET_NAME,
                 s3_key,
-                ExtraArgs={'ContentType': 'audio/wav'}
+                ExtraArgs={'ContentType': 'audio/wav'},
+                Config=S3_TRANSFER_CONFIG
             )
             file_url = f"https://{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{s3_key}"
         except NoCredentialsError:
@@ -263,7 +285,15 @@ async def text_to_wav_and_upload(text: str, voice: Optional[str] = None, file_na
 # Simple local TTS (using Polly) - no S3, just save to /tmp or configurable folder
 # ==============================
 LOCAL_TTS_OUTPUT_DIR = os.getenv("LOCAL_TTS_OUTPUT_DIR", os.path.join(tempfile.gettempdir(), "alpha_tts"))
-os.makedirs(LOCAL_TTS_OUTPUT_DIR, exist_ok=True)
+_LOCAL_TTS_DIR_READY = False
+
+async def ensure_directories():
+    """Create the local TTS output folder once per process (no-op afterwards)."""
+    global _LOCAL_TTS_DIR_READY
+    if _LOCAL_TTS_DIR_READY:
+        return
+    await asyncio.to_thread(os.makedirs, LOCAL_TTS_OUTPUT_DIR, exist_ok=True)
+    _LOCAL_TTS_DIR_READY = True
 
 async def text_to_wav_local(text: str, voice: Optional[str] = None):
     """Generate WAV from text and save locally. Return local file path & metadata.
@@ -303,6 +333,7 @@ async def text_to_wav_local(text: str, voice: Optional[str] = None):
     # Keep function signature minimal; allow caller to rename after saving if needed
     timestamp = int(time.time() * 1000)
     file_name = f"tts_local_{timestamp}.wav"
+    await ensure_directories()
     out_path = os.path.join(LOCAL_TTS_OUTPUT_DIR, file_name)
     final_audio.export(out_path, format='wav')
     duration_seconds = round(len(final_audio) / 1000.0, 2)
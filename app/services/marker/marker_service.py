@@ -19,6 +19,12 @@ def image_to_base64(path: str) -> str:
 class MarkerService:
     def __init__(self, debug_dir: str = "outputs"):
         self.dicts = get_all_dicts()
+        # Dựng sẵn detector cho từng dictionary một lần (thay vì tạo lại ở mỗi request)
+        parameters = cv2.aruco.DetectorParameters()
+        self.detectors = {
+            name: cv2.aruco.ArucoDetector(cv2.aruco.getPredefinedDictionary(d), parameters)
+            for name, d in self.dicts.items()
+        }
         self.debug_dir = debug_dir
         os.makedirs(self.debug_dir, exist_ok=True)
 
@@ -47,10 +53,7 @@ class MarkerService:
         corners_found = None
 
         # # Thử tất cả dictionary
-        for name, d in self.dicts.items():
-            aruco_dict = cv2.aruco.getPredefinedDictionary(d)
-            parameters = cv2.aruco.DetectorParameters()
-            detector = cv2.aruco.ArucoDetector(aruco_dict, parameters)
+        for name, detector in self.detectors.items():
             corners, ids, _ = detector.detectMarkers(processed)
             if ids is not None and len(ids) > 0:
                 detected_ids = ids.flatten().tolist()
@@ -0,0 +1,40 @@
+"""Pre-compile librosa's beat tracking kernels.
+
+Kept free of DB/app imports so it can also run at image build time
+(`python -m app.services.music.beat_warmup`) to fill NUMBA_CACHE_DIR.
+"""
+try:
+    import librosa
+except ImportError:
+    librosa = None
+import numpy as np
+
+WARMUP_SR = 22050
+WARMUP_SECONDS = 8
+
+
+def _run_beat_tracker() -> None:
+    # A 120 BPM click track: silence has no onsets and beat_track returns early
+    # before the numba-jitted DP/tempo code, so the input must contain real beats
+    sr = WARMUP_SR
+    y = librosa.clicks(times=np.arange(0, WARMUP_SECONDS, 0.5), sr=sr, length=WARMUP_SECONDS * sr)
+    y = y.astype(np.float32)
+    # Same call path as planner.detect_beats_and_energy
+    onset_env = librosa.onset.onset_strength(y=y, sr=sr)
+    _, beat_frames = librosa.beat.beat_track(y=y, sr=sr, onset_envelope=onset_env, trim=False)
+    librosa.frames_to_time(beat_frames, sr=sr)
+
+
+def warmup_beat_tracker() -> None:
+    """Run the beat tracker once on a click track so its numba kernels are compiled before the first request."""
+    if not librosa:
+        return
+    try:
+        _run_beat_tracker()
+    except Exception:
+        pass
+
+
+if __name__ == "__main__":
+    # Build-time run: fail loudly instead of silently shipping an empty cache
+    _run_beat_tracker()
@@ -1,24 +1,39 @@
 from __future__ import annotations
+from bisect import bisect_right
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import BinaryIO, List, Literal, Optional, Union
+import asyncio
+import hashlib
 import io
 import random
+import tempfile
 import requests
 import colorsys
 try:
     import librosa
 except Exception:
     librosa = None
+try:
+    import soundfile
+except Exception:
+    soundfile = None
 import numpy as np
+from aiocache import SimpleMemoryCache
 
 from app.services.music.durations import load_all_durations_with_exclusion
 
+SegmentType = Literal['dance', 'action', 'expression']
+
+
 @dataclass
 class PlannedSegment:
+    # Explicit slots (dataclass(slots=True) needs 3.10); no field has a default
+    __slots__ = ('action_id', 'start_time', 'duration', 'action_type')
+
     action_id: str
     start_time: float
     duration: float
-    action_type: str
+    action_type: SegmentType
 
 class MusicActivityPlanner:
     def __init__(self, durations: dict):
@@ -49,28 +64,9 @@ class MusicActivityPlanner:
             intensity = self.action_types.get(code, 2)  # default medium
             self.actions_by_type[intensity].append((code, duration))
 
-        # Keep original cycle lists for backward compatibility
-        self._dance_cycle = list(self.dances.items())
-        self._action_cycle = list(self.actions.items())
-        self._expr_cycle = list(self.expressions.items())
-        self._dance_index = 0
-        self._action_index = 0
-        self._expr_index = 0
-
-    def _next_dance(self) -> tuple[str, float]:
-        item = self._dance_cycle[self._dance_index]
-        self._dance_index = (self._dance_index + 1) % len(self._dance_cycle)
-        return item
-
-    def _next_action(self) -> tuple[str, float]:
-        item = self._action_cycle[self._action_index]
-        self._action_index = (self._action_index + 1) % len(self._action_cycle)
-        return item
-
-    def _next_expression(self) -> tuple[str, float]:
-        item = self._expr_cycle[self._expr_index]
-        self._expr_index = (self._expr_index + 1) % len(self._expr_cycle)
-        return item
+        # Actions sorted by duration (+ parallel durations) for bisecting the closing action
+        self._actions_by_duration = sorted(self.actions.items(), key=lambda kv: kv[1])
+        self._action_durations = [alen for _, alen in self._actions_by_duration]
 
     def plan(self, music_duration: float, beats: Optional[List[float]] = None, energies: Optional[List[float]] = None, seed: Optional[int] = None) -> List[PlannedSegment]:
         rng = random.Random(seed)
@@ -81,10 +77,15 @@ class MusicActivityPlanner:
             beats.append(music_duration)
         if not energies or len(energies) < len(beats) - 1:
             energies = [1.0] * (len(beats) - 1)
-        arr = np.array(energies[: len(beats) - 1])
-        if arr.max() > 0:
-            arr = arr / arr.max()
+        arr = np.array(energies[: len(beats) - 1], dtype=np.float64)
+        peak = arr.max() if arr.size else 0.0
+        if peak > 0:
+            arr /= peak
         med = float(np.median(arr)) if arr.size else 0.5
+        # Mean energy of each 2-beat window (last window has a single beat), computed once
+        window_energies = arr.copy()
+        if arr.size > 1:
+            window_energies[:-1] = (arr[:-1] + arr[1:]) / 2
         segments: List[PlannedSegment] = []
 
         dance_pool = list(self.dances.items())
@@ -107,29 +108,32 @@ class MusicActivityPlanner:
             else:
                 return 3  # strong
 
+        def resolve_pools(by_type: dict, pool: list) -> dict:
+            """Resolve the candidate list for each intensity once (with fallbacks) instead of per pick."""
+            resolved = {}
+            for desired_type in (1, 2, 3):
+                suitable = by_type.get(desired_type, [])
+                # Fallback to adjacent intensities if none available
+                if not suitable:
+                    for fallback_type in [desired_type + 1, desired_type - 1, 2]:
+                        if 1 <= fallback_type <= 3:
+                            suitable = by_type.get(fallback_type, [])
+                            if suitable:
+                                break
+                # If still nothing suitable, use general pool
+                resolved[desired_type] = suitable or pool
+            return resolved
+
+        dance_choices = resolve_pools(self.dances_by_type, dance_pool)
+        action_choices = resolve_pools(self.actions_by_type, action_pool)
+
         def next_dance(energy: float = 0.5) -> tuple[str, float]:
             """Select dance based on energy level"""
             if len(dance_pool) == 0:
                 return '', 0
             nonlocal d_idx
 
-            # Determine desired intensity
-            desired_type = get_intensity_type(energy)
-
-            # Try to find a dance matching the intensity
-            suitable_dances = self.dances_by_type.get(desired_type, [])
-
-            # Fallback to adjacent intensities if none available
-            if not suitable_dances:
-                for fallback_type in [desired_type + 1, desired_type - 1, 2]:
-                    if 1 <= fallback_type <= 3:
-                        suitable_dances = self.dances_by_type.get(fallback_type, [])
-                        if suitable_dances:
-                            break
-
-            # If still no suitable dances, use general pool
-            if not suitable_dances:
-                suitable_dances = dance_pool
+            suitable_dances = dance_choices[get_intensity_type(energy)]
 
             # Add randomness: 30% random selection, 70% sequential
             if rng.random() < 0.30:
@@ -145,23 +149,7 @@ class MusicActivityPlanner:
                 return '', 0
             nonlocal a_idx
 
-            # Determine desired intensity
-            desired_type = get_intensity_type(energy)
-
-            # Try to find an action matching the intensity
-            suitable_actions = self.actions_by_type.get(desired_type, [])
-
-            # Fallback to adjacent intensities if none available
-            if not suitable_actions:
-                for fallback_type in [desired_type + 1, desired_type - 1, 2]:
-                    if 1 <= fallback_type <= 3:
-                        suitable_actions = self.actions_by_type.get(fallback_type, [])
-                        if suitable_actions:
-                            break
-
-            # If still no suitable actions, use general pool
-            if not suitable_actions:
-                suitable_actions = action_pool
+            suitable_actions = action_choices[get_intensity_type(energy)]
 
             # Add randomness: 30% random selection, 70% sequential
             if rng.random() < 0.30:
@@ -175,8 +163,6 @@ class MusicActivityPlanner:
             if len(expr_pool) == 0:
                 return '', 0
             nonlocal e_idx
-            if not expr_pool:
-                return self._next_expression()
             if rng.random() < 0.25:
                 return rng.choice(expr_pool)
             item = expr_pool[e_idx]
@@ -214,7 +200,7 @@ class MusicActivityPlanner:
 
         i = 0
         while i < len(beats) - 1:
-            window_energy = arr[i : min(i + 2, len(arr))].mean() if arr.size else 0.5
+            window_energy = window_energies[i] if arr.size else 0.5
             high = window_energy >= med
             if i + 1 < len(beats) and rng.random() < 0.15:
                 group_len = 1
@@ -238,10 +224,11 @@ class MusicActivityPlanner:
             i = end_idx
 
         # Always end with an ACTION that finishes exactly at the music end.
-        action_items_sorted = sorted(self.actions.items(), key=lambda kv: kv[1])
-        fit_actions = [(aid, alen) for aid, alen in action_items_sorted if alen <= music_duration]
-        if fit_actions:
-            close_id, close_len = fit_actions[-1]
+        action_items_sorted = self._actions_by_duration
+        # Longest action that fits the music (binary search on the sorted durations)
+        fit_count = bisect_right(self._action_durations, music_duration)
+        if fit_count:
+            close_id, close_len = action_items_sorted[fit_count - 1]
             close_start = max(0.0, music_duration - close_len)
             segments = [s for s in segments if (s.start_time + s.duration) <= close_start]
             # Fill entire gap before closing with actions + expressions (no idle)
@@ -276,27 +263,109 @@ class MusicActivityPlanner:
         return cleaned
 
 
-def detect_beats_and_energy(audio_bytes: bytes, sr: int = 22050) -> tuple[List[float], List[float]]:
+_GOLDEN_RATIO_CONJUGATE = 0.618033988749895
+# (saturation, value) per block type
+_COLOR_SV = {'expression': (0.85, 0.95)}
+_DEFAULT_COLOR_SV = (0.70, 0.90)
+
+
+def segment_color(idx: int, atype: str) -> dict:
+    """Deterministic, well-spread ARGB color for the idx-th block (golden-ratio hue walk)."""
+    h = (idx * _GOLDEN_RATIO_CONJUGATE) % 1.0
+    s, v = _COLOR_SV.get(atype, _DEFAULT_COLOR_SV)
+    r, g, b = colorsys.hsv_to_rgb(h, s, v)
+    return {'a': 0, 'r': int(r*255), 'g': int(g*255), 'b': int(b*255)}
+
+
+def _decode_mono(source: BinaryIO, max_sr: int) -> tuple[np.ndarray, int]:
+    """Decode to mono float32: libsndfile straight to numpy, librosa/audioread only as fallback.
+
+    Audio above max_sr is downsampled (fast soxr) before analysis; lower rates are kept as-is
+    rather than upsampled, since beat tracking gains nothing from it.
+    """
+    y = None
+    if soundfile is not None:
+        try:
+            y, native_sr = soundfile.read(source, dtype='float32', always_2d=False)
+            if y.ndim > 1:
+                y = y.mean(axis=1)
+        except Exception:
+            # Format libsndfile can't read (e.g. mp4); let librosa try from the start
+            y = None
+            source.seek(0)
+    if y is None:
+        y, native_sr = librosa.load(source, sr=None, mono=True)
+    if native_sr > max_sr:
+        y = librosa.resample(y, orig_sr=native_sr, target_sr=max_sr, res_type='soxr_qq')
+        native_sr = max_sr
+    return y, native_sr
+
+
+def detect_beats_and_energy(audio: Union[bytes, BinaryIO], sr: int = 22050) -> tuple[List[float], List[float]]:
     if not librosa:
         return [], []
     try:
-        y, sr = librosa.load(io.BytesIO(audio_bytes), sr=sr, mono=True)
+        # File objects (e.g. the spool from fetch_audio) are decoded in place without an extra copy
+        source = io.BytesIO(audio) if isinstance(audio, (bytes, bytearray)) else audio
+        y, sr = _decode_mono(source, sr)
         onset_env = librosa.onset.onset_strength(y=y, sr=sr)
         _, beat_frames = librosa.beat.beat_track(y=y, sr=sr, onset_envelope=onset_env, trim=False)
         beat_times = librosa.frames_to_time(beat_frames, sr=sr)
-        energies: List[float] = []
-        for j in range(len(beat_frames)-1):
-            a = beat_frames[j]; b = beat_frames[j+1]
-            energies.append(float(onset_env[a:b].sum()))
+        # Onset strength summed between consecutive beats, via one prefix sum
+        csum = np.concatenate(([0.0], np.cumsum(onset_env, dtype=np.float64)))
+        energies = (csum[beat_frames[1:]] - csum[beat_frames[:-1]]).tolist()
         return beat_times.tolist(), energies
     except Exception:
         return [], []
 
 
-def fetch_audio(url: str) -> bytes:
-    r = requests.get(url, timeout=30)
-    r.raise_for_status()
-    return r.content
+# Downloads stay in memory up to this size, then roll over to a temp file on disk
+AUDIO_SPOOL_MAX_SIZE = 16 << 20
+AUDIO_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def fetch_audio(url: str) -> BinaryIO:
+    """Stream the audio at url into a spooled temp file (rewound); caller closes it."""
+    spool = tempfile.SpooledTemporaryFile(max_size=AUDIO_SPOOL_MAX_SIZE)
+    try:
+        with requests.get(url, timeout=30, stream=True) as r:
+            r.raise_for_status()
+            for chunk in r.iter_content(AUDIO_DOWNLOAD_CHUNK_SIZE):
+                spool.write(chunk)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+# Beat analysis results keyed by audio content hash; a re-planned song skips librosa entirely
+_BEAT_ANALYSIS_CACHE = SimpleMemoryCache()
+BEAT_ANALYSIS_CACHE_TTL = 60 * 60
+
+
+def _content_digest(audio_file: BinaryIO) -> str:
+    """blake2b of the whole file (read in chunks), rewound afterwards."""
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in iter(lambda: audio_file.read(AUDIO_DOWNLOAD_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    audio_file.seek(0)
+    return digest.hexdigest()
+
+
+async def analyze_audio_cached(audio_file: BinaryIO) -> tuple[List[float], List[float]]:
+    """detect_beats_and_energy with an in-process cache by content hash (returns fresh lists)."""
+    key = f"beats:{await asyncio.to_thread(_content_digest, audio_file)}"
+    cached_result = await _BEAT_ANALYSIS_CACHE.get(key)
+    if cached_result is None:
+        beats, energies = await asyncio.to_thread(detect_beats_and_energy, audio_file)
+        if not beats:
+            # Don't cache failed/empty analysis
+            return beats, energies
+        cached_result = (tuple(beats), tuple(energies))
+        await _BEAT_ANALYSIS_CACHE.set(key, cached_result, ttl=BEAT_ANALYSIS_CACHE_TTL)
+    # plan() appends to beats, so hand out copies
+    return list(cached_result[0]), list(cached_result[1])
 
 
 async def build_activity_json(
@@ -334,15 +403,15 @@ async def build_activity_json(
         if task_id:
             await progress_tracker.update_progress(task_id, 20, "downloading", "Downloading music file...")
 
-        audio_bytes = fetch_audio(music_url)
+        # Download and librosa analysis are blocking; keep them off the event loop
+        with await asyncio.to_thread(fetch_audio, music_url) as audio_file:
+            if task_id:
+                await progress_tracker.update_progress(task_id, 40, "analyzing", "Analyzing beats and energy...")
 
-        if task_id:
-            await progress_tracker.update_progress(task_id, 40, "analyzing", "Analyzing beats and energy...")
-
-        beats, energies = detect_beats_and_energy(audio_bytes)
-        import hashlib
-        h = hashlib.sha1(audio_bytes[:100000]).hexdigest()
-        seed = int(h[:8], 16)
+            h = hashlib.sha1(audio_file.read(100000)).hexdigest()
+            seed = int(h[:8], 16)
+            audio_file.seek(0)
+            beats, energies = await analyze_audio_cached(audio_file)
     except Exception as e:
         if task_id:
             await progress_tracker.update_progress(
@@ -362,15 +431,6 @@ async def build_activity_json(
         await progress_tracker.update_progress(task_id, 80, "building", "Building activity data...")
 
     activity_actions = []
-    golden = 0.618033988749895
-    def gen_color(idx: int, atype: str):
-        h = (idx * golden) % 1.0
-        if atype == 'expression':
-            s, v = 0.85, 0.95
-        else:
-            s, v = 0.70, 0.90
-        r, g, b = colorsys.hsv_to_rgb(h, s, v)
-        return {'a': 0, 'r': int(r*255), 'g': int(g*255), 'b': int(b*255)}
 
     for idx, seg in enumerate(plan):
         atype = 'expression' if seg.action_id in planner.expressions else 'dance'
@@ -380,7 +440,7 @@ async def build_activity_json(
             'start_time': round(seg.start_time, 2),
             'duration': round(seg.duration, 2),
             'action_type': atype,
-            'color': gen_color(idx, atype)
+            'color': segment_color(idx, atype)
         })
 
     if task_id:
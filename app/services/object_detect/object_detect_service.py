@@ -80,15 +80,19 @@ def detect_closest_objects_from_cv2(img: np.ndarray, k: int = 3) -> DetectCloses
     depth_map = estimate_depth(img)
     
     # Step 3: Collect detections with depth metrics
-    detections: List[Detection] = []
+    # Dữ liệu nội bộ đã đúng kiểu nên dựng Detection bằng model_construct (bỏ qua validate)
+    h, w = depth_map.shape
+    make_detection = Detection.model_construct
+    detections_sorted: List[Detection] = []
     for r in results:
         for box in r.boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
             label = r.names[int(box.cls)]
             conf = float(box.conf)
+            if label.lower() == "person" or conf <= 0.4:
+                continue
+            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
             
             # Clip bounding box to image size
-            h, w = depth_map.shape
             x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w - 1, x2), min(h - 1, y2)
             
             # Extract depth inside bounding box
@@ -101,7 +105,7 @@ def detect_closest_objects_from_cv2(img: np.ndarray, k: int = 3) -> DetectCloses
             min_depth = float(np.min(roi))  # closest pixel
             median_depth = float(np.median(roi))
             
-            detections.append(Detection(
+            detections_sorted.append(make_detection(
                 label=label,
                 confidence=conf,
                 bbox=[x1, y1, x2, y2],
@@ -110,10 +114,8 @@ def detect_closest_objects_from_cv2(img: np.ndarray, k: int = 3) -> DetectCloses
                 depth_median=median_depth,
             ))
     
-    filtered = [d for d in detections if d.label.lower() != "person" and d.confidence > 0.4]
-    
     # Step 4: Sort by "closeness" (lowest depth = closest)
-    detections_sorted = sorted(filtered, key=lambda d: d.depth_median or 9999.0)
+    detections_sorted.sort(key=lambda d: d.depth_median or 9999.0)
     
     if not detections_sorted:
         return DetectClosestResponse(closest_objects=[], all_objects=[])
@@ -1,24 +1,64 @@
 from app.models.osmo import OsmoCardSequence, AlphaMiniAction, AlphaMiniActionList, ActionCardList, ActionCard, OsmoCard
-from typing import List
-from fastapi.responses import JSONResponse
+from typing import List, Union
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from starlette.concurrency import run_in_threadpool
 from app.repositories.osmo_card_repository import get_osmo_card_by_color
 import google.generativeai as genai
+from aiocache import SimpleMemoryCache
+import asyncio
+import cv2
+import hashlib
+import numpy as np
 import os
 import json
-from typing import Optional
 
 genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
 
+# Serializes a whole action list in one pydantic-core call
+_ACTIONS_ADAPTER = TypeAdapter(List[AlphaMiniAction])
+
+
+# Ảnh gửi lên Gemini được thu nhỏ về cạnh dài tối đa này; thẻ Osmo là vùng lớn
+# nên vẫn đọc rõ số trên thẻ vàng, còn dung lượng upload giảm nhiều với ảnh điện thoại
+GEMINI_IMAGE_MAX_SIDE = 1600
+
+
+# Kết quả nhận diện thẻ theo hash nội dung ảnh (in-memory, như cache beat của planner)
+_CARD_RECOGNITION_CACHE = SimpleMemoryCache()
+CARD_RECOGNITION_CACHE_TTL = 10 * 60
 
-async def recognize_action_cards_from_image(
-    image_path: str,
-    model_name: str = os.environ.get("GEMINI_MODEL", "gemini-2.0-flash"),
-) -> ActionCardList:
-    model = genai.GenerativeModel(model_name)
 
+def _image_digest(image_bytes: bytes) -> str:
+    return hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+
+
+def _read_file_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _downscale_for_upload(image_bytes: bytes) -> bytes:
+    """Thu nhỏ ảnh lớn (INTER_AREA) và encode lại JPEG; ảnh nhỏ hoặc lỗi decode giữ nguyên."""
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return image_bytes
+    h, w = img.shape[:2]
+    scale = GEMINI_IMAGE_MAX_SIDE / max(h, w)
+    if scale >= 1:
+        return image_bytes
+    small = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return buf.tobytes() if ok else image_bytes
+
+
+async def _ask_gemini_for_cards(image_bytes: bytes, model_name: str) -> list:
+    """Gửi ảnh lên Gemini và trả về list dict các hàng thẻ đã parse từ JSON."""
+    model = genai.GenerativeModel(model_name)
+    image_bytes = await run_in_threadpool(_downscale_for_upload, image_bytes)
     img_file = {
         "mime_type": "image/jpeg",
-        "data": open(image_path, "rb").read()
+        "data": image_bytes
     }
     prompt = """
     You are analyzing an image that contains one or more horizontal rows of Osmo action cards.
@@ -52,7 +92,6 @@ async def recognize_action_cards_from_image(
     ]
     """
 
-    from starlette.concurrency import run_in_threadpool
     response = await run_in_threadpool(model.generate_content, [prompt, img_file])
 
     raw_text = response.text.strip()
@@ -64,6 +103,25 @@ async def recognize_action_cards_from_image(
         parsed = json.loads(raw_text)
     except json.JSONDecodeError:
         raise ValueError(f"Gemini output not valid JSON: {raw_text}")
+    return parsed
+
+
+async def recognize_action_cards_from_image(
+    image: Union[str, bytes],
+    model_name: str = os.environ.get("GEMINI_MODEL", "gemini-2.0-flash"),
+) -> ActionCardList:
+    """image: raw image bytes (preferred, no disk round-trip) or a path to an image file."""
+    if isinstance(image, (bytes, bytearray)):
+        image_bytes = bytes(image)
+    else:
+        image_bytes = await run_in_threadpool(_read_file_bytes, image)
+
+    # Cùng một ảnh (xem trước rồi gửi lại) thì dùng lại kết quả, không gọi Gemini lần nữa
+    key = f"osmo_cards:{model_name}:{await run_in_threadpool(_image_digest, image_bytes)}"
+    parsed = await _CARD_RECOGNITION_CACHE.get(key)
+    if parsed is None:
+        parsed = await _ask_gemini_for_cards(image_bytes, model_name)
+        await _CARD_RECOGNITION_CACHE.set(key, parsed, ttl=CARD_RECOGNITION_CACHE_TTL)
 
     action_cards = []
     for c in parsed:
@@ -74,59 +132,55 @@ async def recognize_action_cards_from_image(
         ))
     return ActionCardList(action_cards=action_cards)
 
+# Màu thẻ hành động -> tiền tố tên action (thay chuỗi if/elif theo màu)
+_OSMO_ACTION_PREFIXES = {
+    "blue": "move",
+    "red": "jump",
+    "orange": "raise_hand",
+}
+
+
 def parse_osmo_cards(card_sequence: OsmoCardSequence) -> AlphaMiniActionList:
     actions: List[AlphaMiniAction] = []
+    cards = card_sequence.cards
+    n = len(cards)
+    prefixes = _OSMO_ACTION_PREFIXES
     i = 0
-    while i < len(card_sequence.cards):
-        card = card_sequence.cards[i]
-        ccolor = getattr(card, "color", None)
-        cvalue = getattr(card, "value", None)
+    while i < n:
+        prefix = prefixes.get(cards[i].color)
 
-        if ccolor in ("blue", "red", "orange"):
+        if prefix is not None:
             # Default values
             direction = "forward"
             step = 1
 
             # Check next card for direction (gray)
-            if i + 1 < len(card_sequence.cards):
-                next_card = card_sequence.cards[i + 1]
-                ncolor = getattr(next_card, "color", None)
-                ndirection = getattr(next_card, "direction", None)
-                if ncolor == "gray" and ndirection:
-                    direction = ndirection
+            if i + 1 < n:
+                next_card = cards[i + 1]
+                if next_card.color == "gray" and next_card.direction:
+                    direction = next_card.direction
                     i += 1  # consume direction card
 
             # Check next card for step (yellow)
-            if i + 1 < len(card_sequence.cards):
-                next_card = card_sequence.cards[i + 1]
-                ncolor = getattr(next_card, "color", None)
-                nvalue = getattr(next_card, "value", None)
-                if ncolor == "yellow" and nvalue is not None:
-                    step = int(nvalue)
+            if i + 1 < n:
+                next_card = cards[i + 1]
+                if next_card.color == "yellow" and next_card.value is not None:
+                    step = int(next_card.value)
                     i += 1  # consume step card
 
-            if ccolor == "blue":
-                action_name = f"move_{direction}"
-            elif ccolor == "red":
-                action_name = f"jump_{direction}"
-            elif ccolor == "orange":
-                action_name = f"raise_hand_{direction}"
-            else:
-                action_name = "unknown"
-
-            actions.append(AlphaMiniAction(action=action_name, value=step))
+            actions.append(AlphaMiniAction(action=f"{prefix}_{direction}", value=step))
         i += 1
     return AlphaMiniActionList(actions=actions)
 
 
 def export_actions_to_json(actions: AlphaMiniActionList, file_path: str):
-    import json
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump([action.dict() for action in actions.actions], f, ensure_ascii=False, indent=2)
+    # pydantic-core encode thẳng ra UTF-8 bytes, không qua list dict trung gian
+    with open(file_path, "wb") as f:
+        f.write(_ACTIONS_ADAPTER.dump_json(actions.actions, indent=2))
 
 
 def export_actions_to_json_response(actions: AlphaMiniActionList):
-    return JSONResponse(content=[action.dict() for action in actions.actions])
+    return ORJSONResponse(content=_ACTIONS_ADAPTER.dump_python(actions.actions, mode="json"))
 
 
 # ------------------ New Parser for ActionCardList ------------------
@@ -135,8 +189,15 @@ async def parse_action_card_list(action_card_list):
     """Chuyển ActionCardList thành list action dictionary, hỗ trợ loop."""
     result = []
     cards = action_card_list.action_cards
+    # Resolve each distinct color once (concurrently) instead of one lookup per card;
+    # the first loop card (gray, no direction) never maps to a DB card, so skip it
+    loop_at = next((k for k, c in enumerate(cards) if c.action.color == "gray" and c.direction is None), None)
+    colors = list({c.action.color for k, c in enumerate(cards) if k != loop_at})
+    db_cards = dict(zip(colors, await asyncio.gather(*(get_osmo_card_by_color(c) for c in colors))))
+    # Mọi thẻ DB đã có sẵn nên chuyển từng thẻ đồng bộ, không tạo coroutine cho mỗi thẻ
+    n = len(cards)
     i = 0
-    while i < len(cards):
+    while i < n:
         card = cards[i]
 
         # ---- LOOP ----
@@ -145,9 +206,8 @@ async def parse_action_card_list(action_card_list):
             loop_body = []
 
             # Lấy toàn bộ các thẻ sau loop
-            for j in range(i + 1, len(cards)):
-                actions_inside = await card_to_action(cards[j])
-                loop_body.extend(actions_inside)
+            for j in range(i + 1, n):
+                loop_body.extend(_card_actions(cards[j], db_cards[cards[j].action.color]))
 
             # result.append({
             #     "type": "loop",
@@ -159,8 +219,7 @@ async def parse_action_card_list(action_card_list):
             break 
 
         # ---- ACTION THƯỜNG ----
-        actions = await card_to_action(card)
-        result.extend(actions)
+        result.extend(_card_actions(card, db_cards[card.action.color]))
         i += 1
 
     return {
@@ -168,20 +227,22 @@ async def parse_action_card_list(action_card_list):
         "data": {'actions': result}
     }
 
-async def card_to_action(card: ActionCard) -> List[dict]:
-    """Convert 1 ActionCard sang list các dict action (mỗi step = 1 item)."""
-    db_card = await get_osmo_card_by_color(card.action.color)
+# Map màu thẻ sang RGB (hằng số, không dựng lại mỗi lần gọi)
+CARD_RGB_COLORS = {
+    "blue": (0, 0, 255),
+    "red": (255, 0, 0),
+    "orange": (255, 165, 0),
+    "yellow": (255, 255, 0),
+    "gray": (128, 128, 128),
+}
+_DEFAULT_CARD_RGB = (255, 255, 255)
+
+
+def _card_actions(card: ActionCard, db_card) -> List[dict]:
+    """Convert 1 ActionCard sang list các dict action (mỗi step = 1 item), với thẻ DB đã resolve sẵn."""
     step_count = card.step.value if card.step else 1
 
-    # Map màu sang RGB
-    color_map = {
-        "blue": [0, 0, 255],
-        "red": [255, 0, 0],
-        "orange": [255, 165, 0],
-        "yellow": [255, 255, 0],
-        "gray": [128, 128, 128],
-    }
-    rgb_color = color_map.get(card.action.color, [255, 255, 255])  # fallback: white
+    rgb_color = CARD_RGB_COLORS.get(card.action.color, _DEFAULT_CARD_RGB)  # fallback: white
 
     # Default values
     action_type = "unknown"
@@ -220,18 +281,10 @@ async def card_to_action(card: ActionCard) -> List[dict]:
         for _ in range(step_count)
     ]
 
-    return result
-
 
 # ------------------ Recognizer ------------------
 
-import cv2, numpy as np, math
-from app.models.osmo import ActionCard, OsmoCard, ActionCardList
-from typing import Optional
-
 def detect_arrow_direction(gray_img):
-    import cv2, numpy as np
-
     g = cv2.resize(gray_img, (120, 120))
     # Nền trắng, mũi tên đậm -> nhị phân ngược
     _, thr = cv2.threshold(g, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
@@ -1,10 +1,38 @@
+import threading
+
 import cv2
 import numpy as np
 
+# 3x3 rectangular structuring element for the closing variant; built once and
+# reused, and rectangular so OpenCV takes its separable morphology path
+QR_MORPH_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+QR_SHARPEN_KERNEL = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]], dtype=np.float32)
+
+# QRCodeDetector and CLAHE hold internal buffers and are not safe to share
+# across threads, so keep one of each per thread instead of one per frame
+_qr_local = threading.local()
+
+
+def _get_qr_detector() -> cv2.QRCodeDetector:
+    detector = getattr(_qr_local, 'detector', None)
+    if detector is None:
+        detector = _qr_local.detector = cv2.QRCodeDetector()
+    return detector
+
+
+def _get_clahe() -> cv2.CLAHE:
+    clahe = getattr(_qr_local, 'clahe', None)
+    if clahe is None:
+        clahe = _qr_local.clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    return clahe
+
 
 def preprocess_image_for_qr_detection(image_bytes):
     """
-    Preprocess image with multiple techniques to improve QR code detection
+    Preprocess image with multiple techniques to improve QR code detection.
+
+    Yields (name, image) variants lazily so callers that stop at the first
+    successful decode never pay for the remaining filters.
     """
     # Convert bytes to numpy array
     nparr = np.frombuffer(image_bytes, np.uint8)
@@ -13,85 +41,50 @@ def preprocess_image_for_qr_detection(image_bytes):
     if original is None:
         raise ValueError("Could not decode image from bytes")
     
-    processed_variants = []
-    
     # 1. Original grayscale
-    processed_variants.append(('original', original))
+    yield 'original', original
     
     # 2. Adaptive thresholding
     adaptive_thresh = cv2.adaptiveThreshold(
         original, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
         cv2.THRESH_BINARY, 11, 2
     )
-    processed_variants.append(('adaptive_thresh', adaptive_thresh))
+    yield 'adaptive_thresh', adaptive_thresh
     
     # 3. Otsu's thresholding
     _, otsu_thresh = cv2.threshold(original, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    processed_variants.append(('otsu_thresh', otsu_thresh))
+    yield 'otsu_thresh', otsu_thresh
     
     # 4. Contrast enhancement using CLAHE
-    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-    contrast_enhanced = clahe.apply(original)
-    processed_variants.append(('contrast_enhanced', contrast_enhanced))
+    contrast_enhanced = _get_clahe().apply(original)
+    yield 'contrast_enhanced', contrast_enhanced
     
     # 5. Denoised version
     denoised = cv2.medianBlur(original, 3)
-    processed_variants.append(('denoised', denoised))
+    yield 'denoised', denoised
     
     # 6. Sharpened version
-    kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
-    sharpened = cv2.filter2D(original, -1, kernel)
-    processed_variants.append(('sharpened', sharpened))
+    sharpened = cv2.filter2D(original, -1, QR_SHARPEN_KERNEL)
+    yield 'sharpened', sharpened
     
     # 7. Morphological operations to enhance QR code patterns
-    kernel_morph = np.ones((3, 3), np.uint8)
-    morph_closed = cv2.morphologyEx(original, cv2.MORPH_CLOSE, kernel_morph)
-    processed_variants.append(('morph_closed', morph_closed))
-    
-    return processed_variants
+    morph_closed = cv2.morphologyEx(original, cv2.MORPH_CLOSE, QR_MORPH_KERNEL)
+    yield 'morph_closed', morph_closed
 
 
 def detect_qr_code(image_bytes: bytes) -> str:
-    processed_images = preprocess_image_for_qr_detection(image_bytes)
-    
-    # Initialize QR code detector
-    qr_detector = cv2.QRCodeDetector()
-    
-    decoded_text = None
-    detection_details = []
+    qr_detector = _get_qr_detector()
     
-    # Try detection on each preprocessed variant
-    for variant_name, processed_img in processed_images:
+    # Try detection on each preprocessed variant, stopping at the first successful decode
+    for _variant_name, processed_img in preprocess_image_for_qr_detection(image_bytes):
         try:
-            # For OpenCV QRCodeDetector, we need to convert back to BGR if using color
-            if len(processed_img.shape) == 2:
-                color_img = cv2.cvtColor(processed_img, cv2.COLOR_GRAY2BGR)
-            else:
-                color_img = processed_img
-            
-            data, bbox, straight_qrcode = qr_detector.detectAndDecode(color_img)
-            
-            if data and len(data) > 0:
-                decoded_text = data
-                detection_details.append({
-                    'variant': variant_name,
-                    'success': True,
-                    'data': data,
-                    'bbox': bbox
-                })
-                break  # Stop at first successful detection
-            else:
-                detection_details.append({
-                    'variant': variant_name,
-                    'success': False,
-                    'data': None
-                })
+            # QRCodeDetector accepts 8-bit grayscale directly (it converts BGR to gray internally),
+            # so the variants are passed as-is without a GRAY2BGR copy
+            data, _, _ = qr_detector.detectAndDecode(processed_img)
+        except Exception:
+            continue
         
-        except Exception as e:
-            detection_details.append({
-                'variant': variant_name,
-                'success': False,
-                'error': str(e)
-            })
+        if data:
+            return data
     
-    return decoded_text
+    return None
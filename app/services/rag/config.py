@@ -29,6 +29,9 @@ class RAGConfig:
     SIMILARITY_THRESHOLD = settings.RAG_SIMILARITY_THRESHOLD
     MAX_CONTEXT_LENGTH = settings.RAG_MAX_CONTEXT_LENGTH
 
+    # Ingestion
+    INGEST_BATCH_SIZE = settings.RAG_INGEST_BATCH_SIZE
+
     # LLM Generation
     LLM_PROVIDER = settings.LLM_PROVIDER
     LLM_MODEL = settings.LLM_MODEL
@@ -29,9 +29,6 @@ class VectorStoreService:
         self.persist_directory = persist_directory or rag_config.CHROMA_PERSIST_DIRECTORY
         self.collection_name = collection_name or rag_config.COLLECTION_NAME
         
-        # Create persist directory if not exists
-        os.makedirs(self.persist_directory, exist_ok=True)
-        
         logger.info(f"Initializing ChromaDB (mode: {rag_config.CHROMA_MODE})")
         
         try:
@@ -57,6 +54,7 @@ class VectorStoreService:
             else:
                 # Local ChromaDB with persistence
                 logger.info(f"Using local ChromaDB at: {self.persist_directory}")
+                # Normally created at image build; only remote mode skips it entirely
                 os.makedirs(self.persist_directory, exist_ok=True)
                 
                 self.client = chromadb.PersistentClient(
@@ -177,6 +175,27 @@ class VectorStoreService:
             logger.error(f"❌ Error adding documents: {e}")
             raise
     
+    def add_documents_in_batches(
+        self,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        batch_size: int = None
+    ) -> None:
+        """
+        Add documents in fixed-size batches so embedding memory and request size stay bounded
+        
+        Args:
+            documents: List of document texts
+            metadatas: List of metadata dictionaries
+            ids: List of unique IDs for each document
+            batch_size: Documents per add call (default: rag_config.INGEST_BATCH_SIZE)
+        """
+        batch_size = max(1, batch_size or rag_config.INGEST_BATCH_SIZE)
+        for start in range(0, len(documents), batch_size):
+            end = start + batch_size
+            self.add_documents(documents[start:end], metadatas[start:end], ids[start:end])
+    
     def query(
         self,
         query_text: str,
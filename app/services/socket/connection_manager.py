@@ -8,6 +8,8 @@ import logging
 
 
 class WSMapEntry:
+    __slots__ = ("websocket", "client_id")
+
     websocket: WebSocket
     client_id: str
 
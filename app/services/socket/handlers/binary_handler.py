@@ -1,11 +1,18 @@
-import json
+import orjson
 
+from pydantic import BaseModel
 from starlette.websockets import WebSocket
 
 from app.models.proto.robot_command_pb2 import RobotRequest
 from app.services.socket.handlers.controller import handle_command
 
 
+async def send_json_message(websocket: WebSocket, data) -> None:
+    """Serialize once with orjson and send as a text frame (robots expect text JSON)."""
+    payload = orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+    await websocket.send_text(payload.decode())
+
+
 async def handle_binary_message(websocket: WebSocket, data: bytes, serial: str, model_id: str):
     try:
         request = RobotRequest()
@@ -15,20 +22,16 @@ async def handle_binary_message(websocket: WebSocket, data: bytes, serial: str,
         result = await handle_command(request, serial, model_id)
         
         # Send the result back as JSON
-        if hasattr(result, 'json') and callable(getattr(result, 'json')):
-            # It's a BaseModel or similar with .json() method
-            json_response = result.json()
-        elif hasattr(result, 'dict') and callable(getattr(result, 'dict')):
-            # It's a BaseModel or similar with .dict() method
-            json_response = json.dumps(result.dict())
+        if isinstance(result, BaseModel):
+            # pydantic v2 serializes straight to JSON in pydantic-core
+            await websocket.send_text(result.model_dump_json())
         else:
             # It's a regular dict, list, or other JSON-serializable type
-            json_response = json.dumps(result, default=str)  # default=str handles non-serializable types
-        await websocket.send_text(json_response)
+            await send_json_message(websocket, result)  # default=str handles non-serializable types
     
     except UnicodeDecodeError as ue:
         print('Decode error', ue)
-        await websocket.send_text(json.dumps({"error": f"Decode error: {str(ue)}"}))
+        await send_json_message(websocket, {"error": f"Decode error: {str(ue)}"})
     except Exception as e:
         print('Other error', e)
-        await websocket.send_text(json.dumps({"error": f"Other error: {str(e)}"}))
\ No newline at end of file
+        await send_json_message(websocket, {"error": f"Other error: {str(e)}"})
@@ -53,22 +53,10 @@ async def detect_object(img: bytes, lang: str):  # detect-object
 
 
 async def parse_osmo(img: bytes):  # parse-osmo
-    import tempfile, os
-    
-    # Create temporary file for the image
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp:
-        temp.write(img)
-        temp_path = temp.name
-    
-    try:
-        # Use your existing logic functions
-        action_card_list = await recognize_action_cards_from_image(temp_path)
-        actions = await parse_action_card_list(action_card_list)
-        return actions
-    except Exception as e:
-        raise e
-    finally:
-        os.remove(temp_path)
+    # The recognizer accepts the image bytes directly
+    action_card_list = await recognize_action_cards_from_image(img)
+    actions = await parse_action_card_list(action_card_list)
+    return actions
 
 
 async def notify_shutdown(serial: str):  # notify-shutdown
@@ -13,8 +13,9 @@ async def handle_command(req: RobotRequest, serial: str, model_id: str):
                 'data': {}
             }
         elif command_type == "process-speech":
-            # Convert asr bytes to ASRData object
-            asr_data = ASRData(arr=list(req.asr))
+            # Convert asr bytes to ASRData object; the samples come straight from
+            # the decoded protobuf, so skip per-element pydantic validation
+            asr_data = ASRData.model_construct(arr=list(req.asr))
             return await process_speech(asr_data, model_id, serial)
         
         elif command_type == 'process-text':
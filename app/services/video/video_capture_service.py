@@ -1,9 +1,10 @@
+import asyncio
 import boto3
 import os
-import uuid
+import time
+import secrets
 import logging
 from io import BytesIO
-from datetime import datetime
 from typing import Optional
 from PIL import Image
 
@@ -48,14 +49,13 @@ async def upload_image_to_s3(image_bytes: bytes) -> Optional[str]:
             raise ValueError(f"Invalid image data: {e}")
 
         # Generate unique S3 key
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        unique_id = str(uuid.uuid4())[:8]
-        s3_key = f"video_captures/{timestamp}_{unique_id}.jpg"
+        s3_key = f"video_captures/{time.time_ns()}_{secrets.token_hex(4)}.jpg"
 
         logger.info(f"Uploading image to S3: {s3_key}")
 
         # Upload to S3
-        s3_client.put_object(
+        await asyncio.to_thread(
+            s3_client.put_object,
             Bucket=S3_BUCKET_NAME,
             Key=s3_key,
             Body=image_bytes,
@@ -1,12 +1,12 @@
 import replicate
 import os
 from fastapi import UploadFile, HTTPException
-from dotenv import load_dotenv
 from typing import Dict, Any
 import base64
 import logging
 
-load_dotenv()
+# .env được load một lần trong config.config
+import config.config  # noqa: F401
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -27,9 +27,8 @@ async def generate_video_from_image(
     Returns video URL and metadata
     """
     try:
-        logger.info(f"Starting video generation for file: {file.filename}")
-        logger.info(f"Description: {description}")
-        logger.info(f"Use default template: {use_default_template}")
+        logger.info("Starting video generation for file: %s (default template: %s)", file.filename, use_default_template)
+        logger.debug("Description: %s", description)
 
         # Set Replicate API token
         if not REPLICATE_API_TOKEN:
@@ -37,30 +36,24 @@ async def generate_video_from_image(
             raise HTTPException(status_code=500, detail="REPLICATE_API_TOKEN not configured")
 
         os.environ["REPLICATE_API_TOKEN"] = REPLICATE_API_TOKEN
-        logger.info("Replicate API token configured")
 
         # Read image file
-        logger.info("Reading image file...")
         image_content = await file.read()
-        await file.seek(0)  # Reset file pointer
-        logger.info(f"Image file read successfully, size: {len(image_content)} bytes")
+        logger.info("Image read size=%d bytes, content type=%s", len(image_content), file.content_type)
 
         # Convert image to base64 data URI
-        logger.info("Converting image to base64...")
         image_base64 = base64.b64encode(image_content).decode('utf-8')
         image_data_uri = f"data:{file.content_type};base64,{image_base64}"
-        logger.info(f"Image converted to base64 data URI, content type: {file.content_type}")
 
         # Apply default template if requested
         final_prompt = DEFAULT_PROMPT_TEMPLATE.format(description=description) if use_default_template else description
-        logger.info(f"Final prompt: {final_prompt}")
+        logger.debug("Final prompt: %s", final_prompt)
 
         # Prepare input for Replicate
         input_data = {
             "image": image_data_uri,
             "prompt": final_prompt
         }
-        logger.info("Input data prepared for Replicate API")
 
         # Run the model
         logger.info("Calling Replicate API to generate video...")
@@ -68,8 +61,7 @@ async def generate_video_from_image(
             "wan-video/wan-2.2-i2v-fast",
             input=input_data
         )
-        logger.info(f"Replicate API call completed. Output type: {type(output)}")
-        logger.info(f"Output value: {output}")
+        logger.debug("Replicate output: %r", output)
 
         # Get video URL - output is already a string URL
         video_url = str(output) if output else None
@@ -78,14 +70,13 @@ async def generate_video_from_image(
             logger.error("No video URL returned from Replicate")
             raise HTTPException(status_code=500, detail="No video URL returned from Replicate")
 
-        logger.info(f"Video URL obtained: {video_url}")
+        logger.info("Video URL obtained: %s", video_url)
 
         result = {
             "video_url": video_url,
             "prompt": final_prompt,
             "original_filename": file.filename
         }
-        logger.info(f"Video generation completed successfully: {result}")
         return result
 
     except Exception as e:
@@ -1,8 +1,12 @@
+_EXPRESS_ERROR_MESSAGES = (
+    "Success",
+    "Timeout",
+    "InvalidParameter",
+    "ConnectionFailed",
+)
+
+
 def get_express_error_str(code: int) -> str:
-    error_map = {
-        0: "Success",
-        1: "Timeout",
-        2: "InvalidParameter",
-        3: "ConnectionFailed",
-    }
-    return error_map.get(code, f"UnknownError({code})")
\ No newline at end of file
+    if 0 <= code < len(_EXPRESS_ERROR_MESSAGES):
+        return _EXPRESS_ERROR_MESSAGES[code]
+    return f"UnknownError({code})"
@@ -1,4 +1,5 @@
 import os
+from functools import cached_property
 from dotenv import load_dotenv
 
 load_dotenv()  # load .env file
@@ -12,6 +13,12 @@ class Settings:
     LICENSE_NAME = os.getenv("APP_LICENSE_NAME", "")
     LICENSE_URL = os.getenv("APP_LICENSE_URL", "")
 
+    # Comma-separated list of allowed origins, "*" allows any origin
+    CORS_ALLOWED_ORIGINS = [o.strip() for o in os.getenv("CORS_ALLOWED_ORIGINS", "*").split(",") if o.strip()]
+    # Credentials (cookies/auth) are only allowed with an explicit origin allowlist, never with "*"
+    CORS_ALLOW_CREDENTIALS = "*" not in CORS_ALLOWED_ORIGINS
+    CORS_MAX_AGE = int(os.getenv("CORS_MAX_AGE", 600))
+
     REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
     REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
@@ -33,6 +40,8 @@ class Settings:
     RAG_TOP_K = int(os.getenv("RAG_TOP_K", 5))
     RAG_SIMILARITY_THRESHOLD = float(os.getenv("RAG_SIMILARITY_THRESHOLD", 0.7))
     RAG_MAX_CONTEXT_LENGTH = int(os.getenv("RAG_MAX_CONTEXT_LENGTH", 4000))
+    # Documents per embed + ChromaDB add call when ingesting the knowledge base
+    RAG_INGEST_BATCH_SIZE = int(os.getenv("RAG_INGEST_BATCH_SIZE", 500))
     
     LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
     LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4-turbo-preview")
@@ -48,5 +57,21 @@ class Settings:
     CHROMA_COMMAND_DB = os.getenv("CHROMA_COMMAND_DB", "command_pool")
     CHROMA_COMMAND_COLLECTION = os.getenv("CHROMA_COMMAND_COLLECTION", "alpha_mini_task")
 
+    @cached_property
+    def fastapi_kwargs(self) -> dict:
+        """App metadata for FastAPI(...); empty contact/license are left out (an empty license URL is invalid)."""
+        kwargs = dict(
+            title=self.TITLE,
+            description=self.DESCRIPTION,
+            version=self.VERSION,
+        )
+        contact = {"name": self.CONTACT_NAME, "email": self.CONTACT_EMAIL}
+        if any(contact.values()):
+            kwargs["contact"] = contact
+        if self.LICENSE_NAME and self.LICENSE_URL:
+            kwargs["license_info"] = {"name": self.LICENSE_NAME, "url": self.LICENSE_URL}
+        return kwargs
+
+
 settings = Settings()
 
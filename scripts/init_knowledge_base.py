@@ -4,8 +4,9 @@ Load data from JSON files into ChromaDB
 """
 import sys
 import os
-import json
+import orjson
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add parent directory to path
@@ -24,8 +25,8 @@ logger = logging.getLogger(__name__)
 def load_json_data(file_path: str):
     """Load data from JSON file"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(file_path, 'rb') as f:
+            data = orjson.loads(f.read())
         logger.info(f"Loaded {len(data)} documents from {file_path}")
         return data
     except Exception as e:
@@ -81,29 +82,55 @@ def init_knowledge_base(auto_mode=False, reset=False):
         json_files = list(data_dir.glob("*.json"))
         logger.info(f"Found {len(json_files)} JSON files")
         
-        for json_file in json_files:
-            logger.info(f"\nProcessing: {json_file.name}")
-            data = load_json_data(str(json_file))
-            for item in data:
-                all_documents.append(item['content'])
-                all_metadatas.append(item['metadata'])
-                all_ids.append(item['id'])
+        # Pipeline: files are parsed in worker threads while earlier batches are embedded
+        # and added here; each full batch is flushed as soon as it is available
+        batch_size = max(1, settings.RAG_INGEST_BATCH_SIZE)
+        flushed = 0
+        
+        def flush(upto: int):
+            nonlocal flushed
+            if upto > flushed:
+                vector_store.add_documents_in_batches(
+                    documents=all_documents[flushed:upto],
+                    metadatas=all_metadatas[flushed:upto],
+                    ids=all_ids[flushed:upto],
+                    batch_size=batch_size
+                )
+                flushed = upto
+        
+        # Batches are committed as they go, so a failure part-way must not leave a
+        # partial collection behind (auto mode would otherwise skip it forever)
+        started_empty = vector_store.get_document_count() == 0
+        
+        logger.info("Adding documents to ChromaDB...")
+        try:
+            with ThreadPoolExecutor(max_workers=min(8, len(json_files) or 1)) as executor:
+                futures = [executor.submit(load_json_data, str(p)) for p in json_files]
+                for json_file, future in zip(json_files, futures):
+                    data = future.result()
+                    logger.info(f"\nProcessing: {json_file.name}")
+                    for item in data:
+                        all_documents.append(item['content'])
+                        all_metadatas.append(item['metadata'])
+                        all_ids.append(item['id'])
+                    flush(flushed + (len(all_documents) - flushed) // batch_size * batch_size)
+            flush(len(all_documents))
+        except Exception:
+            if flushed:
+                logger.warning(f"Ingest failed after {flushed} documents; rolling back")
+                if started_empty:
+                    vector_store.reset_collection()
+                else:
+                    vector_store.delete_documents(all_ids[:flushed])
+            raise
         
         if not all_documents:
             logger.error("❌ No documents found to load!")
             return
         logger.info(f"\n{'=' * 80}")
-        logger.info(f"Total documents to add: {len(all_documents)}")
+        logger.info(f"Total documents added: {len(all_documents)}")
         logger.info(f"{'=' * 80}\n")
         
-        # Add documents to vector store
-        logger.info("Adding documents to ChromaDB...")
-        vector_store.add_documents(
-            documents=all_documents,
-            metadatas=all_metadatas,
-            ids=all_ids
-        )
-        
         # Verify
         final_count = vector_store.get_document_count()
         logger.info(f"\n{'=' * 80}")
@@ -4,7 +4,7 @@ Add, update, or delete documents in ChromaDB
 """
 import sys
 import os
-import json
+import orjson
 import logging
 from pathlib import Path
 from typing import List, Dict, Any
@@ -24,8 +24,8 @@ logger = logging.getLogger(__name__)
 def add_documents_from_json(json_file: str):
     """Add documents from a JSON file"""
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(json_file, 'rb') as f:
+            data = orjson.loads(f.read())
         
         vector_store = get_vector_store_service()
         
@@ -34,7 +34,7 @@ def add_documents_from_json(json_file: str):
         ids = [item['id'] for item in data]
         
         logger.info(f"Adding {len(documents)} documents from {json_file}")
-        vector_store.add_documents(documents, metadatas, ids)
+        vector_store.add_documents_in_batches(documents, metadatas, ids)
         logger.info(f"✅ Successfully added {len(documents)} documents")
         
     except Exception as e:
@@ -44,8 +44,8 @@ def add_documents_from_json(json_file: str):
 def update_documents_from_json(json_file: str):
     """Update existing documents from a JSON file"""
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(json_file, 'rb') as f:
+            data = orjson.loads(f.read())
         
         vector_store = get_vector_store_service()
         